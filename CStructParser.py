@@ -1,12 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+import array
+import hashlib
+import itertools
+import keyword
+import marshal
+import threading
 import re
 import os
 import struct
+import sys
 from ctype_format import CTypeFormat
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, large arrays then go through struct as well
+    np = None
 
-@dataclass
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, compile_unpacker then transposes with NumPy
+    njit = None
+
+# Header tokens: identifiers/numbers and single punctuation characters. Comments and
+# preprocessor lines match with an empty group, so findall yields '' for them
+_RE_TOKEN = re.compile(r'/\*.*?\*/|//[^\n]*|#(?:[^\n/]|/(?![/*]))*|(\w+|[^\w\s])', re.DOTALL)
+
+# States of the structure scanner
+_SCAN_CODE = 0         # Outside of any typedef
+_SCAN_TYPEDEF = 1      # After 'typedef', expecting 'struct'
+_SCAN_HEAD = 2         # After 'typedef struct', skipping an optional tag up to '{'
+_SCAN_BODY = 3         # Inside the braces, collecting field declarations
+_SCAN_NESTED = 4       # Inside unsupported nested braces, skipping the typedef
+_SCAN_NAME = 5         # After '}', expecting the typedef name
+_SCAN_END = 6          # After the name, expecting ';'
+
+# struct format characters that have an exact NumPy dtype equivalent
+_FORMAT_TO_DTYPE = {
+    'b': 'i1', 'B': 'u1',
+    'h': 'i2', 'H': 'u2',
+    'i': 'i4', 'I': 'u4',
+    'l': 'i4', 'L': 'u4',
+    'q': 'i8', 'Q': 'u8',
+    'f': 'f4', 'd': 'f8',
+}
+
+
+def _array_typecode(format_char: str) -> str:
+    """Find the array.array typecode matching the kind and standard size of a struct format."""
+    if format_char in 'fd':
+        return format_char
+    size = struct.calcsize('<' + format_char)
+    for typecode in ('bhilq' if format_char.islower() else 'BHILQ'):
+        if array.array(typecode).itemsize == size:
+            return typecode
+
+
+# array.array typecodes for numeric struct formats, native sizes of C long differ per platform
+_FORMAT_TO_TYPECODE = {format_char: _array_typecode(format_char) for format_char in 'bBhHiIlLqQfd'}
+
+# Array backends selectable for numeric scalar arrays in unpack_data results
+ARRAY_BACKENDS = ('list', 'array', 'numpy')
+
+# Scalar arrays with at least this many elements are decoded with numpy.frombuffer
+NUMPY_ARRAY_THRESHOLD = 32
+
+# Arrays of at least this many flat structures are decoded with Struct.iter_unpack
+# instead of being expanded element by element into the parent's format
+STRUCT_ARRAY_THRESHOLD = 16
+
+
+# Storage types tried, narrowest first, when optimize_bitfields repacks bit fields
+_BIT_STORAGE_TYPES = ('uint8_t', 'uint16_t', 'uint32_t', 'uint64_t')
+
+# Bumped whenever the scanner output stored in header caches changes
+_HEADER_CACHE_VERSION = 2
+
+# Slotted dataclasses need Python 3.10, older versions keep the instance __dict__
+_DATACLASS_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class StructField:
     name: str
     type_name: str  # Store original type name
@@ -17,10 +93,112 @@ class StructField:
     subfields: Dict[str, 'StructField'] = None
     bit_size: Optional[int] = None  # Size in bits for bit fields
     bit_offset: Optional[int] = None  # Offset in bits within the current byte
+    _dtype: object = None  # Endian-prefixed NumPy dtype if the array is decoded with numpy.frombuffer
+    _typecode: Optional[str] = None  # array.array typecode if the array is returned as an array.array
+
+
+@dataclass
+class FieldDesc:
+    format: Optional[str]         # struct format character, None for arrays of structures
+    array_size: Optional[int]
+    offset: int                   # Byte offset from the start of the root structure
+    dtype: object = None          # NumPy dtype for arrays decoded with numpy.frombuffer
+    typecode: Optional[str] = None  # array.array typecode for arrays returned as array.array
+    element: Optional['FlatLayout'] = None  # Element layout for arrays decoded with iter_unpack
+    bit_offset: Optional[int] = None  # Shift of a bit field within its storage unit, 0 starts a new unit
+    bit_mask: Optional[int] = None    # Mask of a bit field after shifting, None for regular fields
+
+
+@dataclass
+class FlatLayout:
+    unpack_struct: struct.Struct  # Flattened format, fields decoded separately are skipped as pad bytes
+    pack_struct: struct.Struct    # Flattened format covering every value
+    descriptors: List[FieldDesc]  # One per leaf field, in format order
+    template: dict                # Nesting of the structure with descriptor indices as leaves
+    struct_name: str              # Name of the flattened structure
+
+    @property
+    def is_flat(self) -> bool:
+        """True if every value comes out of unpack_struct in a single call."""
+        return all(desc.dtype is None and desc.element is None and desc.typecode is None
+                   for desc in self.descriptors)
+
+
+@lru_cache(maxsize=256)
+def _default_array(count: int, default) -> tuple:
+    """Shared tuple of count default values for array input missing from pack_data."""
+    return (default,) * count
+
+
+def _fit_array(values, count: int, default):
+    """Pad or truncate array input to exactly count elements.
+
+    NumPy arrays of any shape are flattened, like multi-dimensional C arrays.
+    """
+    if values is None:
+        if default is _EMPTY_DICT:
+            return (default,) * count
+        return _default_array(count, default)
+    if np is not None and isinstance(values, np.ndarray):
+        values = values.ravel().tolist()
+    if len(values) == count:
+        return values
+    values = list(values[:count])
+    values.extend([default] * (count - len(values)))
+    return values
+
+
+# Stand-in for nested structures missing from the input of pack_data
+_EMPTY_DICT = {}
+
+
+def _record_repr(self) -> str:
+    """repr of generated record classes, listing every field."""
+    values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+    return f'{type(self).__name__}({values})'
+
+
+def _record_eq(self, other) -> bool:
+    """Compare generated records field by field."""
+    if type(other) is not type(self):
+        return NotImplemented
+    return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+def _transpose_records(records, src_offsets, widths, dst_offsets, strides, region_starts, out):
+    """Copy every scalar of every record into per-field column regions of out.
+
+    records is a (count, record_size) uint8 array. For each scalar position p in
+    a record, its widths[p] bytes at src_offsets[p] go to
+    out[count * region_starts[p] + i * strides[p] + dst_offsets[p]] for record i.
+    """
+    count = records.shape[0]
+    for p in range(src_offsets.shape[0]):
+        src = src_offsets[p]
+        width = widths[p]
+        stride = strides[p]
+        dst = count * region_starts[p] + dst_offsets[p]
+        for i in range(count):
+            base = dst + i * stride
+            for b in range(width):
+                out[base + b] = records[i, src + b]
+
+
+_transpose_kernel = None
+
+
+def _get_transpose_kernel():
+    """JIT-compile _transpose_records on first use."""
+    global _transpose_kernel
+    if _transpose_kernel is None:
+        _transpose_kernel = njit(cache=True)(_transpose_records)
+    return _transpose_kernel
 
 
 class CStructParser:
-    def __init__(self, path_or_string: str, endian: str = 'little', debug: bool = False):
+    def __init__(self, path_or_string: str, endian: str = 'little', debug: bool = False,
+                 array_backend: str = 'list', cache_dir: Optional[str] = None,
+                 optimize_bitfields: bool = False):
         """
         Initialize CStructParser
         Args:
@@ -28,25 +206,56 @@ class CStructParser:
                           or a string containing C struct definitions
             endian: Endianness of the data, either 'little' or 'big'
             debug: Enable debug output
+            array_backend: How unpack_data returns numeric arrays, either 'list',
+                          'array' for array.array objects decoded in one copy, or
+                          'numpy' for read-only NumPy views into the data (requires NumPy)
+            cache_dir: Directory caching scanned header files by path, modification
+                          time and size, e.g. ~/.cache/CStructParser. Only used when
+                          parsing a directory, None disables the cache
+            optimize_bitfields: Store each run of consecutive bit fields in the
+                          narrowest unsigned integers that hold it instead of their
+                          declared types, when that takes fewer bytes. This changes
+                          the binary layout, so it only suits data produced by a
+                          parser with the same setting
         """
         if endian not in ('little', 'big'):
             raise ValueError("Endian must be either 'little' or 'big'")
+        if array_backend not in ARRAY_BACKENDS:
+            raise ValueError(f"Array backend must be one of {', '.join(ARRAY_BACKENDS)}")
+        if array_backend == 'numpy' and np is None:
+            raise RuntimeError("The 'numpy' array backend requires NumPy to be installed")
             
         self.endian_prefix = '<' if endian == 'little' else '>'
+        self.array_backend = array_backend
+        self.cache_dir = cache_dir
+        self.optimize_bitfields = optimize_bitfields
+        # array.array decodes in native byte order, arrays are byteswapped when the data differs
+        self._byteswap = endian != sys.byteorder
         self.struct_formats = CTypeFormat.get_all_formats()
+        # Size per type name, calculate_sizes adds every structure once it is sized
+        self._size_cache = {type_name: size for type_name, (_, size) in self.struct_formats.items()}
         self.struct_sizes = {}
         self.struct_fields = {}
         self.debug = debug
+        # Flattened layout and generated unpack/pack functions per root structure, built lazily
+        self._layouts: Dict[str, FlatLayout] = {}
+        self._unpackers: Dict[str, Callable[..., Tuple[dict, int]]] = {}
+        self._packers: Dict[str, Callable[..., Optional[bytes]]] = {}
+        self._np_dtypes: Dict[Tuple[str, bool], object] = {}
+        self._bulk_unpackers: Dict[str, Callable[..., dict]] = {}
+        # Slotted record class per structure and generated unpack functions building them
+        self._record_classes: Dict[str, type] = {}
+        self._object_unpackers: Dict[str, Callable[..., Tuple[object, int]]] = {}
 
         # Check if the input is a directory path or content string
         if os.path.isdir(path_or_string):
-            # Parse all header files in the directory
-            for file in os.listdir(path_or_string):
-                if file.endswith('.h'):
-                    filepath = os.path.join(path_or_string, file)
-                    with open(filepath, 'r') as f:
-                        content = f.read()
-                    self.parse_header_file_as_string(content)
+            # Parse all header files in the directory, reading and scanning them concurrently
+            with os.scandir(path_or_string) as entries:
+                header_paths = [entry.path for entry in entries if entry.name.endswith('.h') and entry.is_file()]
+            if header_paths:
+                with ThreadPoolExecutor(max_workers=min(8, len(header_paths))) as executor:
+                    for structs in executor.map(self._scan_header, header_paths):
+                        self._add_structs(structs)
         else:
             # Treat input as direct content string
             self.parse_header_file_as_string(path_or_string)
@@ -55,180 +264,342 @@ class CStructParser:
         try:
             self.calculate_sizes()
         except RuntimeError as e:
-            print(f"Error calculating sizes: {e}")
+            self._debug_print(f"Error calculating sizes: {e}")
             raise
         
 
-    def _remove_comments(self, content: str) -> str:
-        """Remove C-style comments from the content."""
-        # Remove multi-line comments first
-        content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-        # Remove single-line comments
-        content = re.sub(r'//.*?$', '', content, flags=re.MULTILINE)
-        return content
+    def _scan_header(self, path: str) -> List[tuple]:
+        """Scan a header file, going through the on-disk cache if cache_dir is set."""
+        if self.cache_dir is None:
+            return list(self._scan_structs(self._read_header(path)))
+
+        stat = os.stat(path)
+        key = repr((_HEADER_CACHE_VERSION, os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+        cache_path = os.path.join(self.cache_dir, hashlib.sha1(key.encode()).hexdigest() + '.marshal')
+        try:
+            with open(cache_path, 'rb') as f:
+                structs = marshal.load(f)
+            if isinstance(structs, list):
+                return structs
+        except Exception:
+            # Unreadable or corrupt caches are rebuilt below
+            pass
+
+        structs = list(self._scan_structs(self._read_header(path)))
+        self._debug_print(f"Caching scanned header {path} in {cache_path}")
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a private file first so concurrent parsers never read a partial cache
+            temp_path = f'{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'wb') as f:
+                marshal.dump(structs, f)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+        return structs
+
+    @staticmethod
+    def _read_header(path: str) -> str:
+        """Read a header file as UTF-8, replacing undecodable bytes."""
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8', 'replace')
+
+    def _scan_structs(self, content: str):
+        """Scan header content for typedef'd structures in a single pass, skipping comments.
+
+        Yields (struct_name, declarations) where each declaration is
+        (type_name, field_name, dimensions, bit_size), with bit_size None for
+        regular fields. Declarations that are not plain fields, arrays or bit
+        fields (pointers, function pointers, ...) are skipped.
+        """
+        state = _SCAN_CODE
+        declarations = []
+        declaration = []
+        struct_name = None
+        depth = 0
+        for token in _RE_TOKEN.findall(content):
+            if not token:
+                continue
+            if state == _SCAN_CODE:
+                if token == 'typedef':
+                    state = _SCAN_TYPEDEF
+            elif state == _SCAN_TYPEDEF:
+                state = _SCAN_HEAD if token == 'struct' else _SCAN_CODE
+            elif state == _SCAN_HEAD:
+                if token == '{':
+                    state = _SCAN_BODY
+                    declarations = []
+                    declaration = []
+                elif token == ';':
+                    state = _SCAN_CODE
+            elif state == _SCAN_BODY:
+                if token == ';':
+                    parsed = self._parse_declaration(declaration)
+                    if parsed is not None:
+                        declarations.append(parsed)
+                    declaration = []
+                elif token == '}':
+                    state = _SCAN_NAME
+                elif token == '{':
+                    state = _SCAN_NESTED
+                    depth = 1
+                else:
+                    declaration.append(token)
+            elif state == _SCAN_NESTED:
+                if token == '{':
+                    depth += 1
+                elif token == '}':
+                    depth -= 1
+                    if depth == 0:
+                        state = _SCAN_CODE
+            elif state == _SCAN_NAME:
+                if token[0].isalpha() or token[0] == '_':
+                    struct_name = token
+                    state = _SCAN_END
+                else:
+                    state = _SCAN_CODE
+            elif state == _SCAN_END:
+                if token == ';':
+                    yield struct_name, declarations
+                state = _SCAN_CODE
+
+    @staticmethod
+    def _parse_declaration(tokens: List[str]) -> Optional[Tuple[str, str, List[int], Optional[int]]]:
+        """Split the tokens of one declaration into (type_name, field_name, dimensions, bit_size)."""
+        words = 0
+        while words < len(tokens) and (tokens[words][0].isalnum() or tokens[words][0] == '_'):
+            words += 1
+        if words < 2:
+            return None
+        rest = tokens[words:]
+        dimensions = []
+        bit_size = None
+        if len(rest) == 2 and rest[0] == ':' and rest[1].isdigit():
+            bit_size = int(rest[1])
+        else:
+            for i in range(0, len(rest), 3):
+                dimension = rest[i:i + 3]
+                if len(dimension) != 3 or dimension[0] != '[' or dimension[2] != ']' or not dimension[1].isdigit():
+                    return None
+                dimensions.append(int(dimension[1]))
+        return ' '.join(tokens[:words - 1]), tokens[words - 1], dimensions, bit_size
 
     def parse_header_file_as_string(self, content: str)-> None: 
         """Parse a header file content string to extract structure definitions."""
-        cleaned_content = self._remove_comments(content)
-        struct_pattern = r'typedef\s+struct[^{]*{([^}]+)}\s*(\w+)\s*;'
-        structs = re.finditer(struct_pattern, cleaned_content)
+        self._add_structs(self._scan_structs(content))
 
-        for struct_match in structs:
-            struct_body = struct_match.group(1)
-            struct_name = struct_match.group(2)
-            
+    def _add_structs(self, structs) -> None:
+        """Create the fields of (struct_name, declarations) pairs from _scan_structs."""
+        for struct_name, declarations in structs:
+            struct_name = sys.intern(struct_name)
             fields = {}
             current_byte_offset = 0
             current_bit_offset = 0
             current_base_type = None
             current_base_size = 0
             
-            for line in struct_body.split('\n'):
-                line = line.strip()
-                if line:
-                    # Try to match bit field first
-                    bit_field_match = re.match(r'((?:\w+\s+)*\w+)\s+(\w+)\s*:\s*(\d+)\s*;', line)
-                    if bit_field_match:
-                        type_name, field_name, bit_size = bit_field_match.groups()
-                        type_name = type_name.strip()  # Clean up any extra whitespace
-                        bit_size = int(bit_size)
-                        
-                        self._debug_print(f"Processing bit field: {field_name} of type {type_name} with size {bit_size} bits")
-                        self._debug_print(f"Current state: base_type={current_base_type}, bit_offset={current_bit_offset}")
+            for type_name, field_name, dimensions, bit_size in declarations:
+                # Interned names let result dict stores match keys by identity
+                field_name = sys.intern(field_name)
+                type_name = sys.intern(type_name)
+                if bit_size is not None:
+                    self._debug_print(f"Processing bit field: {field_name} of type {type_name} with size {bit_size} bits")
+                    self._debug_print(f"Current state: base_type={current_base_type}, bit_offset={current_bit_offset}")
+                    
+                    if type_name not in self.struct_formats:
+                        raise ValueError(f"Unsupported bit field type: {type_name}")
                         
-                        if type_name not in self.struct_formats:
-                            raise ValueError(f"Unsupported bit field type: {type_name}")
-                            
-                        format_char, base_size = self.struct_formats[type_name]
-                        self._debug_print(f"Base type size: {base_size} bytes")
+                    format_char, base_size = self.struct_formats[type_name]
+                    if format_char in ('f', 'd'):
+                        raise ValueError(f"Bit field {struct_name}.{field_name} has floating-point type {type_name}")
+                    if format_char == 'c':
+                        # struct's 'c' yields bytes, char storage units are read as unsigned bytes
+                        format_char = 'B'
+                    self._debug_print(f"Base type size: {base_size} bytes")
+                    
+                    # Check if we need to start a new base type
+                    if current_bit_offset + bit_size > base_size * 8:
+                        self._debug_print("Starting new base type storage unit (exceeded bits)")
+                        current_byte_offset += current_base_size if current_base_size > 0 else 0
+                        current_bit_offset = 0
+                        current_base_type = type_name
+                        current_base_size = base_size
+                    elif current_base_type is None:
+                        self._debug_print("Starting first base type storage unit")
+                        current_base_type = type_name
+                        current_base_size = base_size
                         
-                        # Check if we need to start a new base type
-                        if current_bit_offset + bit_size > base_size * 8:
-                            self._debug_print("Starting new base type storage unit (exceeded bits)")
-                            current_byte_offset += current_base_size if current_base_size > 0 else 0
-                            current_bit_offset = 0
-                            current_base_type = type_name
-                            current_base_size = base_size
-                        elif current_base_type is None:
-                            self._debug_print("Starting first base type storage unit")
-                            current_base_type = type_name
-                            current_base_size = base_size
-                            
+                    fields[field_name] = StructField(
+                        name=field_name,
+                        type_name=type_name,
+                        format=format_char,
+                        size=base_size,
+                        is_struct=False,
+                        array_size=None,
+                        bit_size=bit_size,
+                        bit_offset=current_bit_offset
+                    )
+                    self._debug_print(f"Created bit field {field_name} with offset {current_bit_offset}")
+                    current_bit_offset += bit_size
+                    self._debug_print(f"Updated bit offset to {current_bit_offset}")
+                    
+                else:
+                    # Reset bit field tracking when encountering non-bit field
+                    if current_bit_offset > 0:
+                        current_byte_offset += current_base_size
+                        current_bit_offset = 0
+                        current_base_type = None
+                        current_base_size = 0
+                    
+                    # Handle regular fields, total array size is the product of all dimensions
+                    array_size = 1
+                    if dimensions:
+                        for dim in dimensions:
+                            array_size *= dim
+                    else:
+                        array_size = None
+                
+                    if type_name in self.struct_formats:
+                        format_char, size = self.struct_formats[type_name]
+                        # Add endianness prefix for multi-byte types, but not for chars and single bytes
+                        if size > 1 and format_char not in ('c', 'b', 'B'):
+                            format_char = format_char
                         fields[field_name] = StructField(
                             name=field_name,
                             type_name=type_name,
                             format=format_char,
-                            size=base_size,
+                            size=size * (array_size if array_size else 1),
                             is_struct=False,
-                            array_size=None,
-                            bit_size=bit_size,
-                            bit_offset=current_bit_offset
+                            array_size=array_size,
+                            bit_size=None,
+                            bit_offset=None
                         )
-                        self._debug_print(f"Created bit field {field_name} with offset {current_bit_offset}")
-                        current_bit_offset += bit_size
-                        self._debug_print(f"Updated bit offset to {current_bit_offset}")
-                        
                     else:
-                        # Reset bit field tracking when encountering non-bit field
-                        if current_bit_offset > 0:
-                            current_byte_offset += current_base_size
-                            current_bit_offset = 0
-                            current_base_type = None
-                            current_base_size = 0
-                        
-                        # Handle regular fields
-                        field_match = re.match(r'((?:\w+\s+)*\w+)\s+(\w+)(?:\[(\d+)\])*;', line)
-                        if field_match:
-                            type_name, field_name = field_match.groups()[:2]
-                            type_name = type_name.strip()  # Clean up any extra whitespace
-                            
-                            # Find all array dimensions using findall
-                            dimensions = re.findall(r'\[(\d+)\]', line)
-                            # Calculate total array size as product of all dimensions
-                            array_size = 1
-                            if dimensions:
-                                for dim in dimensions:
-                                    array_size *= int(dim)
-                            else:
-                                array_size = None
-                        
-                            if type_name in self.struct_formats:
-                                format_char, size = self.struct_formats[type_name]
-                                # Add endianness prefix for multi-byte types, but not for chars and single bytes
-                                if size > 1 and format_char not in ('c', 'b', 'B'):
-                                    format_char = format_char
-                                fields[field_name] = StructField(
-                                    name=field_name,
-                                    type_name=type_name,
-                                    format=format_char,
-                                    size=size * (array_size if array_size else 1),
-                                    is_struct=False,
-                                    array_size=array_size,
-                                    bit_size=None,
-                                    bit_offset=None
-                                )
-                            else:
-                                fields[field_name] = StructField(
-                                    name=field_name,
-                                    type_name=type_name,
-                                    format=None,
-                                    size=None,
-                                    is_struct=True,
-                                    array_size=array_size,
-                                    subfields=None
-                                )
+                        fields[field_name] = StructField(
+                            name=field_name,
+                            type_name=type_name,
+                            format=None,
+                            size=None,
+                            is_struct=True,
+                            array_size=array_size,
+                            subfields=None
+                        )
 
+            if self.optimize_bitfields:
+                self._repack_bit_fields(fields)
             self.struct_fields[struct_name] = fields
 
+    def _repack_bit_fields(self, fields: Dict[str, StructField]) -> None:
+        """Move each run of consecutive bit fields into the narrowest unsigned storage units.
+
+        Each run is split, in declaration order, into the units taking the fewest
+        bytes in total (the fewest units among equal sizes). Runs that would not
+        get smaller keep their declared units, so a structure never grows.
+        """
+        storage = [(type_name, *self.struct_formats[type_name]) for type_name in _BIT_STORAGE_TYPES]
+        runs = []
+        previous_is_bit_field = False
+        for field in fields.values():
+            if field.bit_size is None:
+                previous_is_bit_field = False
+                continue
+            if not previous_is_bit_field:
+                runs.append([])
+            runs[-1].append(field)
+            previous_is_bit_field = True
+
+        for run in runs:
+            # best[i] is the (bytes, units, split point, storage) packing the first i bit fields
+            best = [(0, 0, 0, None)]
+            for end in range(1, len(run) + 1):
+                candidates = []
+                bits = 0
+                for start in range(end - 1, -1, -1):
+                    bits += run[start].bit_size
+                    unit = next((unit for unit in storage if unit[2] * 8 >= bits), None)
+                    if unit is None:
+                        break
+                    size, units = best[start][:2]
+                    candidates.append((size + unit[2], units + 1, start, unit))
+                best.append(min(candidates, key=lambda candidate: candidate[:2]))
+
+            declared_size = sum(field.size for field in run if field.bit_offset == 0)
+            if best[-1][0] >= declared_size:
+                continue
+            end = len(run)
+            while end:
+                _, _, start, (storage_type, format_char, size) = best[end]
+                bit_offset = 0
+                for field in run[start:end]:
+                    field.type_name = storage_type
+                    field.format = format_char
+                    field.size = size
+                    field.bit_offset = bit_offset
+                    bit_offset += field.bit_size
+                self._debug_print(f"Repacked bit fields {', '.join(field.name for field in run[start:end])} "
+                                  f"into {storage_type} ({bit_offset} bits)")
+                end = start
+
 
     def calculate_sizes(self) -> None:
         """Calculate sizes and set up subfields for all structures after all files are parsed"""
-        def process_struct(struct_name: str, visited: set) -> tuple[int, dict]:
-            if struct_name in visited:
+        in_progress = set()  # Structures on the current recursion path, for cycle detection
+        endian_prefix = self.endian_prefix
+
+        def process_struct(struct_name: str) -> tuple[int, dict]:
+            if struct_name in self.struct_sizes:
+                return self.struct_sizes[struct_name], self.struct_fields[struct_name]
+
+            if struct_name in in_progress:
                 raise RuntimeError(f"Circular dependency detected for struct {struct_name}")
             
             if struct_name not in self.struct_fields:
                 raise RuntimeError(f"Unknown structure type: {struct_name}")
                 
-            visited.add(struct_name)
+            in_progress.add(struct_name)
             total_size = 0
             fields = self.struct_fields[struct_name]
             
-            current_base_type = None  # Track base type for bit fields
+            current_base_size = 0     # Size in bytes of the current bit field storage unit, 0 if none
             current_bits_used = 0     # Track bits used in current base type
             total_size = 0
             
             for field in fields.values():
                 if field.bit_size is not None:
                     # Handle bit fields
-                    if current_base_type is None or current_bits_used + field.bit_size > self._get_type_size(field.type_name) * 8:
+                    field_type_size = self._get_type_size(field.type_name)
+                    if not current_base_size or current_bits_used + field.bit_size > field_type_size * 8:
                         # If we're starting a new base type or would exceed current one
-                        if current_base_type is not None:
-                            total_size += self._get_type_size(current_base_type)
-                        current_base_type = field.type_name
+                        total_size += current_base_size
+                        current_base_size = field_type_size
                         current_bits_used = field.bit_size
                     else:
                         current_bits_used += field.bit_size
                 else:
                     # Regular field - first complete any pending bit field storage
-                    if current_base_type is not None:
-                        total_size += self._get_type_size(current_base_type)
-                        current_base_type = None
+                    if current_base_size:
+                        total_size += current_base_size
+                        current_base_size = 0
                         current_bits_used = 0
 
                     if field.array_size:
                         if field.is_struct:
                             # Array of structures
-                            struct_size, subfields = process_struct(field.type_name, visited.copy())
+                            struct_size, subfields = process_struct(field.type_name)
                             field.size = struct_size * field.array_size
                             field.subfields = subfields
                         else:
                             # Array of basic types
                             field.size = self._get_type_size(field.type_name) * field.array_size
+                            if (np is not None and field.format in _FORMAT_TO_DTYPE
+                                    and (field.array_size >= NUMPY_ARRAY_THRESHOLD or self.array_backend == 'numpy')):
+                                field._dtype = np.dtype(endian_prefix + _FORMAT_TO_DTYPE[field.format])
+                            if self.array_backend == 'array':
+                                field._typecode = _FORMAT_TO_TYPECODE.get(field.format)
                     else:
                         if field.is_struct:
                             # Single structure
-                            struct_size, subfields = process_struct(field.type_name, visited.copy())
+                            struct_size, subfields = process_struct(field.type_name)
                             field.size = struct_size
                             field.subfields = subfields
                         else:
@@ -238,178 +609,592 @@ class CStructParser:
                     total_size += field.size
             
             # Add size of last bit field group if exists
-            if current_base_type is not None:
-                total_size += self._get_type_size(current_base_type)
-                
+            total_size += current_base_size
+
+            in_progress.discard(struct_name)
             self.struct_sizes[struct_name] = total_size
+            self._size_cache[struct_name] = total_size
             return total_size, fields
 
-        # Process all structures
-        for struct_name in list(self.struct_fields.keys()):
+        # Process all structures, process_struct records each size in struct_sizes itself
+        for struct_name in self.struct_fields:
             if struct_name not in self.struct_sizes:
-                self.struct_sizes[struct_name], self.struct_fields[struct_name] = process_struct(struct_name, set())
+                process_struct(struct_name)
 
+        # Flatten every structure into a single format string up front
+        for struct_name in self.struct_fields:
+            self._get_layout(struct_name)
 
-    def unpack_data(self, data: bytes, root_struct: str) -> dict:
-        """Unpack binary data according to the parsed structure"""
-        def unpack_struct(data: bytes, offset: int, fields: Dict[str, StructField]) -> tuple[dict, int]:
-            result = {}
-            current_offset = offset
-            current_bit_field_value = None
-            current_base_type = None
-            
-            for field_name, field in fields.items():
-                if field.bit_size is not None:
-                    # Handle bit fields
-                    if field.bit_offset == 0:
-                        # Start of a new bit field group
-                        format_char = self._get_struct_format(field.type_name)
-                        current_bit_field_value = struct.unpack_from(f"{self.endian_prefix}{format_char}", data, current_offset)[0]
-                        current_base_type = field.type_name
-                    
-                    # Extract bits from the current bit field value
-                    mask = (1 << field.bit_size) - 1
-                    value = (current_bit_field_value >> field.bit_offset) & mask
-                    result[field_name] = value
-                    
-                    # Move to next byte group if this was the last bit field in current group
-                    is_last_field = field is list(fields.values())[-1]
-                    next_field = None if is_last_field else list(fields.values())[list(fields.values()).index(field) + 1]
-                    if is_last_field or next_field.bit_size is None or next_field.bit_offset == 0:
-                        current_offset += self._get_type_size(current_base_type)
-                        current_bit_field_value = None
-                else:
-                    # Handle regular fields
-                    if field.array_size:
-                        array_size = field.array_size
-                        if field.is_struct:
-                            # Handle array of structures
-                            array_values = []
-                            for _ in range(array_size):
-                                sub_result, sub_offset = unpack_struct(data, current_offset, self.struct_fields[field.type_name])
-                                array_values.append(sub_result)
-                                current_offset = sub_offset
-                            result[field_name] = array_values
-                        else:
-                            # Handle array of basic types
-                            struct_format = self._get_struct_format(field.type_name)
-                            array_format = f"{self.endian_prefix}{array_size}{struct_format}"
-                            values = struct.unpack_from(array_format, data, current_offset)
-                            result[field_name] = list(values)
-                            current_offset += array_size * self._get_type_size(field.type_name)
-                    else:
-                        if field.is_struct:
-                            # Handle nested structure
-                            sub_result, sub_offset = unpack_struct(data, current_offset, self.struct_fields[field.type_name])
-                            result[field_name] = sub_result
-                            current_offset = sub_offset
-                        else:
-                            # Handle basic type
-                            struct_format = self._get_struct_format(field.type_name)
-                            value = struct.unpack_from(f"{self.endian_prefix}{struct_format}", data, current_offset)[0]
-                            result[field_name] = value
-                            current_offset += self._get_type_size(field.type_name)
-                    
-            return result, current_offset
 
-        result, _ = unpack_struct(data, 0, self.struct_fields[root_struct])
-        return result
+    def unpack_data(self, data: bytes, root_struct: str, as_numpy: bool = False, as_object: bool = False):
+        """Unpack binary data according to the parsed structure
+
+        Args:
+            data: Binary data to unpack
+            root_struct: Name of the structure to unpack
+            as_numpy: Return large numeric arrays (NUMPY_ARRAY_THRESHOLD elements
+                      or more) as read-only NumPy views into data instead of lists.
+                      Always on with the 'numpy' array backend. Requires NumPy.
+            as_object: Return instances of generated record classes with __slots__
+                      (one per structure, named after it) instead of dicts
+        """
+        if root_struct not in self.struct_fields:
+            raise ValueError(f"Unknown structure: {root_struct}")
+        if as_numpy and np is None:
+            raise RuntimeError("as_numpy requires NumPy to be installed")
+        as_numpy = as_numpy or self.array_backend == 'numpy'
+
+        unpacker = self._get_object_unpacker(root_struct) if as_object else self._get_unpacker(root_struct)
+        return unpacker(data, 0, as_numpy)[0]
+
+    def _get_record_class(self, struct_name: str) -> type:
+        """Get the slotted record class of a structure, generating it on first use."""
+        if struct_name not in self._record_classes:
+            names = tuple(self.struct_fields[struct_name])
+            parameters = [f'_{i}' for i in range(len(names))]
+            lines = [f'def __init__({", ".join(["self"] + parameters)}):']
+            for name, parameter in zip(names, parameters):
+                if keyword.iskeyword(name):
+                    lines.append(f'    _setattr(self, {name!r}, {parameter})')
+                else:
+                    lines.append(f'    self.{name} = {parameter}')
+            if not names:
+                lines.append('    pass')
+            init = self._exec_generated(struct_name, lines, {'_setattr': setattr}, '__init__')
+            self._record_classes[struct_name] = type(struct_name, (), {
+                '__slots__': names,
+                '__init__': init,
+                '__repr__': _record_repr,
+                '__eq__': _record_eq,
+            })
+        return self._record_classes[struct_name]
 
 
     def pack_data(self, data_dict: dict, root_struct: str) -> bytes:
         """Pack dictionary data according to the parsed structure"""
-        def pack_struct(data_dict: dict, fields: Dict[str, StructField]) -> bytes:
-            result = bytearray()
-            current_byte = 0
-            current_bit_pos = 0
-            current_base_type = None
-            base_type_size = 0
-            
-            for field_name, field in fields.items():
-                field_data = data_dict.get(field_name, None)
-                
-                if field.bit_size is not None:
-                    # Handle bit fields
-                    value = field_data if field_data is not None else 0
-                    mask = (1 << field.bit_size) - 1
-                    value &= mask
-                    
-                    # Check if we're starting a new base type
-                    if field.bit_offset == 0:
-                        if current_bit_pos > 0:
-                            # Write previous base type if exists
-                            result.extend(struct.pack(f"{self.endian_prefix}{current_base_type}", current_byte))
-                        current_byte = value
-                        current_bit_pos = field.bit_size
-                        current_base_type = field.format
-                        base_type_size = self._get_type_size(field.type_name)
-                    else:
-                        current_byte |= (value << field.bit_offset)
-                        current_bit_pos = field.bit_offset + field.bit_size
-                    
-                    # Write byte if this is the last field or next field is not a bit field
-                    is_last_field = field is list(fields.values())[-1]
-                    next_field = None if is_last_field else list(fields.values())[list(fields.values()).index(field) + 1]
-                    if is_last_field or next_field.bit_size is None or next_field.bit_offset == 0:
-                        result.extend(struct.pack(f"{self.endian_prefix}{current_base_type}", current_byte))
-                        current_byte = 0
-                        current_bit_pos = 0
-                else:
-                    # Handle regular fields
-                    if current_bit_pos > 0:
-                        # Flush any remaining bit fields
-                        result.extend(struct.pack(f"{self.endian_prefix}{current_base_type}", current_byte))
-                        current_byte = 0
-                        current_bit_pos = 0
-                        current_base_type = None
-                    
-                    if field.array_size:
-                        array_data = field_data if field_data else [0] * field.array_size
-                        array_data.extend([0] * (field.array_size - len(array_data)))
-                        array_format = f"{self.endian_prefix}{field.array_size}{field.format}"
-                        result.extend(struct.pack(array_format, *array_data[:field.array_size]))
-                    else:
-                        value = field_data if field_data is not None else 0
-                        result.extend(struct.pack(f"{self.endian_prefix}{field.format}", value))
-                
-            return bytes(result)
+        if root_struct not in self.struct_fields:
+            raise ValueError(f"Unknown structure: {root_struct}")
+
+        return self._get_packer(root_struct)(data_dict)
+
+    def pack_into(self, data_dict: dict, root_struct: str, buffer, offset: int = 0) -> int:
+        """Pack dictionary data into a writable buffer instead of allocating bytes
 
+        Args:
+            data_dict: Values to pack, as accepted by pack_data
+            root_struct: Name of the structure to pack
+            buffer: Writable buffer such as a bytearray or memoryview
+            offset: Position of the record in buffer
+
+        Returns the offset just past the packed record, so back-to-back records
+        can be written into one preallocated buffer.
+        """
         if root_struct not in self.struct_fields:
             raise ValueError(f"Unknown structure: {root_struct}")
-            
-        return pack_struct(data_dict, self.struct_fields[root_struct])
+        size = self.struct_sizes[root_struct]
+        if offset < 0 or memoryview(buffer).nbytes - offset < size:
+            raise ValueError(f"Buffer too small for {root_struct} ({size} bytes) at offset {offset}")
+
+        self._get_packer(root_struct)(data_dict, buffer, offset)
+        return offset + size
+
+    def _get_layout(self, root_struct: str) -> FlatLayout:
+        """Get the flattened layout of a structure, building it if not done by calculate_sizes.
+
+        The whole structure, including nested structures and arrays of structures,
+        is compiled into one format string so a single C-level call handles every
+        field.
+        """
+        if root_struct not in self._layouts:
+            unpack_parts = [self.endian_prefix]
+            pack_parts = [self.endian_prefix]
+            descriptors = []
+            template, _ = self._build_flat_layout(self.struct_fields[root_struct], 0,
+                                                  unpack_parts, pack_parts, descriptors)
+            self._layouts[root_struct] = FlatLayout(
+                unpack_struct=struct.Struct(''.join(unpack_parts)),
+                pack_struct=struct.Struct(''.join(pack_parts)),
+                descriptors=descriptors,
+                template=template,
+                struct_name=root_struct
+            )
+        return self._layouts[root_struct]
+
+    def _get_unpacker(self, root_struct: str) -> Callable[..., Tuple[dict, int]]:
+        """Get the generated unpack function of a structure."""
+        if root_struct not in self._unpackers:
+            self._unpackers[root_struct] = self._compile_unpacker(root_struct, self._get_layout(root_struct))
+        return self._unpackers[root_struct]
+
+    def _get_object_unpacker(self, root_struct: str) -> Callable[..., Tuple[object, int]]:
+        """Get the generated unpack function building record objects."""
+        if root_struct not in self._object_unpackers:
+            self._object_unpackers[root_struct] = self._compile_unpacker(root_struct, self._get_layout(root_struct),
+                                                                         as_object=True)
+        return self._object_unpackers[root_struct]
+
+    def _get_packer(self, root_struct: str) -> Callable[..., Optional[bytes]]:
+        """Get the generated pack function of a structure."""
+        if root_struct not in self._packers:
+            self._packers[root_struct] = self._compile_packer(root_struct, self._get_layout(root_struct))
+        return self._packers[root_struct]
+
+    def _compile_unpacker(self, root_struct: str, layout: FlatLayout,
+                          as_object: bool = False) -> Callable[..., Tuple[dict, int]]:
+        """Generate a straight-line unpack function for a flattened layout.
+
+        The generated function calls unpack_from once and builds the nested
+        result as a single dict literal, e.g.:
+
+            def _unpack(data, offset=0, as_numpy=False):
+                v = _S.unpack_from(data, offset)
+                return {'x': v[0], 'pos': {'a': v[1], 'b': list(v[2:6])}}, offset + 28
+
+        With as_object the result is built from record class calls instead,
+        e.g. _R_Root(v[0], _R_Pos(v[1], list(v[2:6]))).
+        """
+        namespace = {'_S': layout.unpack_struct, '_frombuffer': np.frombuffer if np is not None else None,
+                     '_array': array.array}
+        lines = ['def _unpack(data, offset=0, as_numpy=False):',
+                 '    v = _S.unpack_from(data, offset)']
+        if any(desc.element is not None or desc.typecode is not None for desc in layout.descriptors):
+            lines.append('    view = memoryview(data)')
+        expressions = []
+        index = 0
+        for i, desc in enumerate(layout.descriptors):
+            if desc.element is not None:
+                # Array of flat structures: one iter_unpack over the whole array
+                element_lines = ['def _E{}(v):'.format(i),
+                                 '    return ' + self._render_tuple_unpack(desc.element, as_object, namespace)]
+                exec(compile('\n'.join(element_lines) + '\n', f'<CStructParser _E{i} {root_struct}>', 'exec'), namespace)
+                namespace[f'_I{i}'] = desc.element.unpack_struct
+                end_offset = desc.offset + desc.element.unpack_struct.size * desc.array_size
+                lines.append(f'    a{i} = list(map(_E{i}, _I{i}.iter_unpack(view[offset + {desc.offset}:offset + {end_offset}])))')
+                expressions.append(f'a{i}')
+            elif desc.typecode is not None:
+                # Numeric array returned as array.array, or as a NumPy view if requested
+                indent = '    '
+                if desc.dtype is not None:
+                    namespace[f'_D{i}'] = desc.dtype
+                    lines.append('    if as_numpy:')
+                    lines.append(f'        a{i} = _frombuffer(data, dtype=_D{i}, count={desc.array_size}, offset=offset + {desc.offset})')
+                    lines.append('    else:')
+                    indent = '        '
+                end_offset = desc.offset + struct.calcsize(f'<{desc.array_size}{desc.format}')
+                lines.append(f'{indent}a{i} = _array({desc.typecode!r})')
+                lines.append(f'{indent}a{i}.frombytes(view[offset + {desc.offset}:offset + {end_offset}])')
+                if self._byteswap:
+                    lines.append(f'{indent}a{i}.byteswap()')
+                expressions.append(f'a{i}')
+            elif desc.dtype is not None:
+                namespace[f'_D{i}'] = desc.dtype
+                lines.append(f'    a{i} = _frombuffer(data, dtype=_D{i}, count={desc.array_size}, offset=offset + {desc.offset})')
+                lines.append('    if not as_numpy:')
+                lines.append(f'        a{i} = a{i}.tolist()')
+                expressions.append(f'a{i}')
+            else:
+                expression, index = self._tuple_expression(desc, index)
+                expressions.append(expression)
+
+        result = self._render_result(layout, expressions, as_object, namespace)
+        lines.append(f'    return {result}, offset + {layout.pack_struct.size}')
+        return self._exec_generated(root_struct, lines, namespace, '_unpack')
+
+    def _render_tuple_unpack(self, layout: FlatLayout, as_object: bool, namespace: dict) -> str:
+        """Render the expression building a result from the tuple v of a flat layout."""
+        expressions = []
+        index = 0
+        for desc in layout.descriptors:
+            expression, index = self._tuple_expression(desc, index)
+            expressions.append(expression)
+        return self._render_result(layout, expressions, as_object, namespace)
+
+    def _render_result(self, layout: FlatLayout, expressions: List[str], as_object: bool, namespace: dict) -> str:
+        """Render the result of a flat layout as dict literals or record class calls."""
+        if as_object:
+            return self._render_record(layout.struct_name, layout.template, expressions, namespace)
+        return self._render_template(layout.template, expressions)
+
+    def _render_record(self, struct_name: str, node: dict, expressions: List[str], namespace: dict) -> str:
+        """Render a layout template node as a record class call, adding the class to namespace."""
+        class_name = f'_R_{struct_name}'
+        namespace[class_name] = self._get_record_class(struct_name)
+        arguments = []
+        for field_name, field in self.struct_fields[struct_name].items():
+            value = node[field_name]
+            if isinstance(value, dict):
+                arguments.append(self._render_record(field.type_name, value, expressions, namespace))
+            elif isinstance(value, list):
+                arguments.append('[' + ', '.join(self._render_record(field.type_name, element, expressions, namespace)
+                                                 for element in value) + ']')
+            else:
+                arguments.append(expressions[value])
+        return f'{class_name}({", ".join(arguments)})'
+
+    @staticmethod
+    def _tuple_expression(desc: FieldDesc, index: int) -> Tuple[str, int]:
+        """Render the expression reading a descriptor's value from the tuple v at index.
+
+        Returns the expression and the index of the next unread value.
+        """
+        if desc.bit_mask is not None:
+            # Bit fields after the first one of a storage unit read the unit already consumed
+            if desc.bit_offset == 0:
+                return f'v[{index}] & {desc.bit_mask}', index + 1
+            return f'(v[{index - 1}] >> {desc.bit_offset}) & {desc.bit_mask}', index
+        if desc.array_size is None:
+            return f'v[{index}]', index + 1
+        return f'list(v[{index}:{index + desc.array_size}])', index + desc.array_size
+
+    def _render_template(self, node, expressions: List[str]) -> str:
+        """Render a layout template as nested dict/list literals of the leaf expressions."""
+        if isinstance(node, dict):
+            return '{' + ', '.join(f'{key!r}: {self._render_template(value, expressions)}'
+                                   for key, value in node.items()) + '}'
+        if isinstance(node, list):
+            return '[' + ', '.join(self._render_template(value, expressions) for value in node) + ']'
+        return expressions[node]
+
+    def _compile_packer(self, root_struct: str, layout: FlatLayout) -> Callable[..., Optional[bytes]]:
+        """Generate a pack function for a flattened layout.
+
+        The function returns bytes, or writes into buffer at offset when one is
+        given. Missing fields default to zero, short arrays are padded and missing
+        nested structures are packed as all zeros.
+        """
+        namespace = {'_S': layout.pack_struct, '_fit_array': _fit_array, '_EMPTY_DICT': _EMPTY_DICT,
+                     '_chain': itertools.chain.from_iterable}
+        lines = ['def _pack(d, buffer=None, offset=0):']
+        arguments = self._emit_pack_arguments(root_struct, layout, layout.template, 'd', lines,
+                                              itertools.count(), namespace)
+        lines.append('    if buffer is None:')
+        lines.append(f'        return _S.pack({", ".join(arguments)})')
+        lines.append(f'    _S.pack_into(buffer, offset, {", ".join(arguments)})')
+        return self._exec_generated(root_struct, lines, namespace, '_pack')
+
+    def _emit_pack_arguments(self, root_struct: str, layout: FlatLayout, node: dict, source: str,
+                             lines: List[str], counter, namespace: dict) -> List[str]:
+        """Append lines fetching nested dicts and return the pack argument expressions for node."""
+        arguments = []
+        for key, value in node.items():
+            if isinstance(value, dict):
+                name = f'd{next(counter)}'
+                lines.append(f'    {name} = {source}.get({key!r}) or _EMPTY_DICT')
+                arguments.extend(self._emit_pack_arguments(root_struct, layout, value, name, lines, counter, namespace))
+            elif isinstance(value, list):
+                name = f'd{next(counter)}'
+                lines.append(f'    {name} = _fit_array({source}.get({key!r}), {len(value)}, _EMPTY_DICT)')
+                for i, element in enumerate(value):
+                    element_name = f'd{next(counter)}'
+                    lines.append(f'    {element_name} = {name}[{i}]')
+                    arguments.extend(self._emit_pack_arguments(root_struct, layout, element, element_name,
+                                                               lines, counter, namespace))
+            else:
+                desc = layout.descriptors[value]
+                if desc.element is not None:
+                    # Array of flat structures: one generated function returning each element's values
+                    function_name = f'_P{value}'
+                    element_lines = [f'def {function_name}(d):']
+                    element_arguments = self._emit_pack_arguments(root_struct, desc.element, desc.element.template,
+                                                                  'd', element_lines, itertools.count(), namespace)
+                    element_lines.append(f'    return ({", ".join(element_arguments)},)')
+                    exec(compile('\n'.join(element_lines) + '\n', f'<CStructParser {function_name} {root_struct}>',
+                                 'exec'), namespace)
+                    arguments.append(f'*_chain(map({function_name}, '
+                                     f'_fit_array({source}.get({key!r}), {desc.array_size}, _EMPTY_DICT)))')
+                    continue
+                if desc.bit_mask is not None:
+                    # Bit fields of a storage unit are combined into the unit's single argument
+                    term = f'({self._value_expression(source, key, 0)} & {desc.bit_mask})'
+                    if desc.bit_offset == 0:
+                        arguments.append(term)
+                    else:
+                        arguments[-1] += f' | {term} << {desc.bit_offset}'
+                    continue
+                default = b'\x00' if desc.format == 'c' else 0
+                if desc.array_size is None:
+                    arguments.append(self._value_expression(source, key, default))
+                else:
+                    arguments.append(f'*_fit_array({source}.get({key!r}), {desc.array_size}, {default!r})')
+        return arguments
+
+    @staticmethod
+    def _value_expression(source: str, key: str, default) -> str:
+        """Expression reading key from the dict named source, with missing and None values as default."""
+        return f'(_v if (_v := {source}.get({key!r})) is not None else {default!r})'
+
+    def _exec_generated(self, root_struct: str, lines: List[str], namespace: dict, function_name: str) -> Callable:
+        """Compile generated source lines and return the defined function."""
+        source = '\n'.join(lines) + '\n'
+        self._debug_print(f"Generated {function_name} for {root_struct}:\n{source}")
+        exec(compile(source, f'<CStructParser {function_name} {root_struct}>', 'exec'), namespace)
+        return namespace[function_name]
+
+    def _build_flat_layout(self, fields: Dict[str, StructField], offset: int,
+                           unpack_parts: List[str], pack_parts: List[str],
+                           descriptors: List[FieldDesc]) -> Tuple[dict, int]:
+        """Append format characters and descriptors for fields starting at byte offset.
+
+        Each bit field storage unit becomes one integer in the format, shared by
+        the descriptors of its bit fields. Returns an empty result template
+        mirroring the nesting of the structure and the offset past the last field.
+        """
+        template = {}
+        unit_offset = offset
+        for field_name, field in fields.items():
+            if field.bit_size is not None:
+                if field.bit_offset == 0:
+                    unpack_parts.append(field.format)
+                    pack_parts.append(field.format)
+                    unit_offset = offset
+                    offset += field.size
+                template[field_name] = len(descriptors)
+                descriptors.append(FieldDesc(field.format, None, unit_offset,
+                                             bit_offset=field.bit_offset, bit_mask=(1 << field.bit_size) - 1))
+                continue
+            if field.is_struct:
+                subfields = self.struct_fields[field.type_name]
+                element_layout = self._get_layout(field.type_name) if field.array_size else None
+                if (element_layout is not None and field.array_size >= STRUCT_ARRAY_THRESHOLD
+                        and element_layout.is_flat):
+                    # Long array of flat structures, decoded with iter_unpack over the element format
+                    unpack_parts.append(f"{field.size}x")
+                    pack_parts.append(element_layout.pack_struct.format[1:] * field.array_size)
+                    template[field_name] = len(descriptors)
+                    descriptors.append(FieldDesc(None, field.array_size, offset, element=element_layout))
+                    offset += field.size
+                elif field.array_size:
+                    elements = []
+                    for _ in range(field.array_size):
+                        element, offset = self._build_flat_layout(subfields, offset, unpack_parts,
+                                                                  pack_parts, descriptors)
+                        elements.append(element)
+                    template[field_name] = elements
+                else:
+                    template[field_name], offset = self._build_flat_layout(subfields, offset, unpack_parts,
+                                                                           pack_parts, descriptors)
+            else:
+                dtype = field._dtype
+                if dtype is not None or field._typecode is not None:
+                    unpack_parts.append(f"{field.size}x")
+                    pack_parts.append(f"{field.array_size}{field.format}")
+                elif field.array_size:
+                    unpack_parts.append(f"{field.array_size}{field.format}")
+                    pack_parts.append(f"{field.array_size}{field.format}")
+                else:
+                    unpack_parts.append(field.format)
+                    pack_parts.append(field.format)
+                template[field_name] = len(descriptors)
+                descriptors.append(FieldDesc(field.format, field.array_size, offset, dtype,
+                                             typecode=field._typecode))
+                offset += field.size
+        return template, offset
+
+    def unpack_array(self, data: bytes, root_struct: str, count: Optional[int] = None):
+        """Unpack back-to-back records into a NumPy structured array without building dicts.
+
+        Args:
+            data: Binary data holding the records
+            root_struct: Name of the structure of each record
+            count: Number of records, defaults to as many as fit in data
+
+        Returns a read-only ndarray of shape (count,) viewing data, with a nested
+        structured dtype matching the C layout (e.g. arr['pos']['x']). Prefer this
+        over repeated unpack_data calls for bulk, vectorized processing; use
+        arr.tolist() for plain Python values. Requires NumPy.
+
+        Structures with bit fields are returned as a new array instead, with one
+        field per bit field extracted from the storage units with vectorized
+        shifts and masks.
+        """
+        dtype = self._np_dtype_for(root_struct)
+        storage_dtype = self._np_dtype_for(root_struct, storage=True)
+        if count is None:
+            count = len(data) // storage_dtype.itemsize
+        records = np.frombuffer(data, dtype=storage_dtype, count=count)
+        if storage_dtype == dtype:
+            return records
+        result = np.empty(count, dtype=dtype)
+        self._extract_bit_fields(root_struct, records, result)
+        return result
+
+    def _extract_bit_fields(self, struct_name: str, records, result) -> None:
+        """Copy storage-layout records into result, splitting bit field storage units."""
+        unit = None
+        for field_name, field in self.struct_fields[struct_name].items():
+            if field.bit_size is not None:
+                if field.bit_offset == 0:
+                    unit = records[field_name]
+                values = unit >> field.bit_offset
+                if field.bit_size < unit.dtype.itemsize * 8:
+                    values &= (1 << field.bit_size) - 1
+                result[field_name] = values
+            elif field.is_struct and (self._np_dtype_for(field.type_name)
+                                      != self._np_dtype_for(field.type_name, storage=True)):
+                self._extract_bit_fields(field.type_name, records[field_name], result[field_name])
+            else:
+                result[field_name] = records[field_name]
+
+    def compile_unpacker(self, root_struct: str) -> Callable[..., dict]:
+        """Compile a bulk decoder for many back-to-back records of a structure.
+
+        Returns decode(data, count=None), which returns a dict mirroring the
+        structure with one contiguous NumPy array of shape (count, ...) per
+        field (count defaults to as many records as fit in data). With Numba
+        installed the transpose from records to columns runs in a JIT-compiled
+        kernel, otherwise NumPy copies each field out of a structured view.
+        Requires NumPy; structures with bit fields are not supported.
+        """
+        if root_struct in self._bulk_unpackers:
+            return self._bulk_unpackers[root_struct]
+
+        dtype = self._np_dtype_for(root_struct)
+        if dtype != self._np_dtype_for(root_struct, storage=True):
+            raise ValueError(f"Structure {root_struct} has bit fields, use unpack_array instead")
+        record_size = dtype.itemsize
+        leaves = []  # (path, scalar dtype, shape, byte offsets of each scalar within a record)
+
+        def collect(node_dtype, path: tuple, shape: tuple, bases: List[int]) -> None:
+            for name in node_dtype.names:
+                field_dtype, field_offset = node_dtype.fields[name][:2]
+                field_shape = shape
+                positions = [base + field_offset for base in bases]
+                if field_dtype.subdtype is not None:
+                    field_dtype, (length,) = field_dtype.subdtype
+                    field_shape = shape + (length,)
+                    positions = [base + i * field_dtype.itemsize for base in positions for i in range(length)]
+                if field_dtype.names:
+                    collect(field_dtype, path + (name,), field_shape, positions)
+                else:
+                    leaves.append((path + (name,), field_dtype, field_shape, positions))
+
+        collect(dtype, (), (), [0])
+
+        use_kernel = njit is not None
+        if use_kernel:
+            src_offsets, widths, dst_offsets, strides, region_starts = [], [], [], [], []
+            region_start = 0
+            for _, leaf_dtype, _, positions in leaves:
+                width = leaf_dtype.itemsize
+                for k, position in enumerate(positions):
+                    src_offsets.append(position)
+                    widths.append(width)
+                    dst_offsets.append(k * width)
+                    strides.append(len(positions) * width)
+                    region_starts.append(region_start)
+                region_start += len(positions) * width
+            tables = [np.array(table, dtype=np.int64)
+                      for table in (src_offsets, widths, dst_offsets, strides, region_starts)]
+            kernel = _get_transpose_kernel()
+
+        def decode(data, count: Optional[int] = None) -> dict:
+            if count is None:
+                count = len(data) // record_size
+            result = {}
+            if use_kernel:
+                records = np.frombuffer(data, dtype=np.uint8, count=count * record_size).reshape(count, record_size)
+                out = np.empty(count * record_size, dtype=np.uint8)
+                kernel(records, *tables, out)
+                region_start = 0
+            else:
+                records = np.frombuffer(data, dtype=dtype, count=count)
+            for path, leaf_dtype, shape, positions in leaves:
+                if use_kernel:
+                    region_size = count * len(positions) * leaf_dtype.itemsize
+                    column = out[region_start:region_start + region_size].view(leaf_dtype).reshape((count,) + shape)
+                    region_start += region_size
+                else:
+                    column = records
+                    for key in path:
+                        column = column[key]
+                    column = np.ascontiguousarray(column)
+                target = result
+                for key in path[:-1]:
+                    target = target.setdefault(key, {})
+                target[path[-1]] = column
+            return result
+
+        self._bulk_unpackers[root_struct] = decode
+        return decode
+
+    def _np_dtype_for(self, struct_name: str, storage: bool = False):
+        """Build the packed NumPy structured dtype of a structure.
+
+        With storage=True the dtype matches the binary layout, each bit field
+        storage unit being one integer field named after its first bit field.
+        Otherwise every bit field is a field of its own, so the two only differ
+        for structures containing bit fields.
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for structured dtypes")
+        if struct_name not in self.struct_fields:
+            raise ValueError(f"Unknown structure: {struct_name}")
+        key = (struct_name, storage)
+        if key not in self._np_dtypes:
+            spec = []
+            for field_name, field in self.struct_fields[struct_name].items():
+                if field.bit_size is not None:
+                    if storage and field.bit_offset != 0:
+                        continue
+                    # Extracted bit fields are masked, so never negative
+                    bit_format = field.format if storage else field.format.upper()
+                    spec.append((field_name, np.dtype(self.endian_prefix + _FORMAT_TO_DTYPE[bit_format])))
+                    continue
+                if field.is_struct:
+                    field_dtype = self._np_dtype_for(field.type_name, storage)
+                elif field.format == 'c':
+                    field_dtype = np.dtype('S1')
+                else:
+                    field_dtype = np.dtype(self.endian_prefix + _FORMAT_TO_DTYPE[field.format])
+                if field.array_size:
+                    spec.append((field_name, field_dtype, (field.array_size,)))
+                else:
+                    spec.append((field_name, field_dtype))
+            self._np_dtypes[key] = np.dtype(spec)
+        return self._np_dtypes[key]
 
     def print_struct_tree(self, root_struct: str, indent: str = "", is_array: bool = False) -> None:
         """Print the structure tree starting from the given root structure.
         
         Args:
             root_struct: Name of the root structure to print
-            indent: Current indentation level (used recursively)
-            is_array: Whether the current structure is part of an array
+            indent: Indentation of the root line
+            is_array: Whether the root structure is part of an array
         """
         if root_struct not in self.struct_fields:
             raise ValueError(f"Unknown structure: {root_struct}")
 
-        array_info = "[]" if is_array else ""
-        print(f"{indent}└── {root_struct}{array_info}")
-        fields = self.struct_fields[root_struct]
-        
-        for field_name, field in fields.items():
+        # Depth-first walk with an explicit stack, items are either a finished
+        # line or a (struct_name, indent, is_array) structure still to expand
+        lines = []
+        stack = [(root_struct, indent, is_array)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                lines.append(item)
+                continue
+            struct_name, indent, is_array = item
+            array_info = "[]" if is_array else ""
+            lines.append(f"{indent}└── {struct_name}{array_info}\n")
             new_indent = indent + "    "
-            array_suffix = f"[{field.array_size}]" if field.array_size else ""
-            
-            if field.is_struct:
-                # For struct types, recursively print their fields
-                print(f"{new_indent}└── {field_name}{array_suffix} ({field.type_name})")
-                self.print_struct_tree(field.type_name, new_indent + "    ", bool(field.array_size))
-            else:
-                # For basic types, print type information with bit field details if present
-                size_info = f"{field.size} bytes"
-                type_info = f"{field.type_name} ({size_info})"
-                if field.bit_size is not None:
-                    bit_info = f" [bits {field.bit_offset}:{field.bit_offset + field.bit_size - 1}]"
-                    type_info += bit_info
-                print(f"{new_indent}└── {field_name}{array_suffix}: {type_info}")
+            children = []
+            for field_name, field in self.struct_fields[struct_name].items():
+                array_suffix = f"[{field.array_size}]" if field.array_size else ""
+                
+                if field.is_struct:
+                    # For struct types, expand their fields right below the field line
+                    children.append(f"{new_indent}└── {field_name}{array_suffix} ({field.type_name})\n")
+                    children.append((field.type_name, new_indent + "    ", bool(field.array_size)))
+                else:
+                    # For basic types, print type information with bit field details if present
+                    size_info = f"{field.size} bytes"
+                    type_info = f"{field.type_name} ({size_info})"
+                    if field.bit_size is not None:
+                        bit_info = f" [bits {field.bit_offset}:{field.bit_offset + field.bit_size - 1}]"
+                        type_info += bit_info
+                    children.append(f"{new_indent}└── {field_name}{array_suffix}: {type_info}\n")
+            stack.extend(reversed(children))
+        sys.stdout.write(''.join(lines))
 
 
     def get_struct_size(self, struct_name: str) -> int:
@@ -418,55 +1203,9 @@ class CStructParser:
             raise ValueError(f"Unknown structure: {struct_name}")
         return self.struct_sizes[struct_name]
 
-    def _get_struct_format(self, type_name: str) -> str:
-        """Get struct format character for a given type name."""
-        type_formats = {
-            'char': 'c',
-            'unsigned char': 'B',
-            'short': 'h',
-            'unsigned short': 'H',
-            'int': 'i',
-            'unsigned int': 'I',
-            'long': 'l',
-            'unsigned long': 'L',
-            'float': 'f',
-            'double': 'd',
-            'int8_t': 'b',
-            'uint8_t': 'B',
-            'int16_t': 'h',
-            'uint16_t': 'H',
-            'int32_t': 'i',
-            'uint32_t': 'I',
-            'int64_t': 'q',
-            'uint64_t': 'Q'
-        }
-        return type_formats.get(type_name, '')
-
     def _get_type_size(self, type_name: str) -> int:
         """Get size in bytes for a given type name."""
-        type_sizes = {
-            'char': 1,
-            'unsigned char': 1,
-            'short': 2,
-            'unsigned short': 2,
-            'int': 4,
-            'unsigned int': 4,
-            'long': 8,
-            'unsigned long': 8,
-            'float': 4,
-            'double': 8,
-            'int8_t': 1,
-            'uint8_t': 1,
-            'int16_t': 2,
-            'uint16_t': 2,
-            'int32_t': 4,
-            'uint32_t': 4,
-            'int64_t': 8,
-            'uint64_t': 8
-        }
-        if type_name in self.struct_fields:
-            return self.struct_sizes[type_name]
-        return type_sizes.get(type_name, 0)
+        return self._size_cache.get(type_name, 0)
 
     def _print_struct_sizes(self):
         """Debug helper to print all structure sizes"""
@@ -1,4 +1,5 @@
-from typing import Dict, Tuple
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
 
 
 class CTypeFormat:
@@ -70,21 +71,30 @@ class CTypeFormat:
         # Remove extra spaces and normalize to single space between words
         return ' '.join(word for word in type_name.split() if word)
 
+    # Combined formats, built by the first get_all_formats call
+    _all_formats_cache: Optional[Mapping[str, Tuple[str, int]]] = None
+
     @classmethod
-    def get_all_formats(cls) -> Dict[str, Tuple[str, int]]:
-        """Returns all format specifications combined into a single dictionary."""
-        all_formats = {}
-        all_formats.update(cls.STANDARD_TYPES)
-        all_formats.update(cls.FIXED_WIDTH_TYPES)
-        all_formats.update(cls.MIN_WIDTH_TYPES)
-        all_formats.update(cls.FAST_TYPES)
-        all_formats.update(cls.SPECIAL_TYPES)
+    def get_all_formats(cls) -> Mapping[str, Tuple[str, int]]:
+        """Returns all format specifications combined into a single read-only mapping.
+
+        The mapping is built once per class and shared by every caller.
+        """
+        # Looked up in the class itself so subclasses overriding the tables get their own
+        if cls.__dict__.get('_all_formats_cache') is None:
+            all_formats = {}
+            all_formats.update(cls.STANDARD_TYPES)
+            all_formats.update(cls.FIXED_WIDTH_TYPES)
+            all_formats.update(cls.MIN_WIDTH_TYPES)
+            all_formats.update(cls.FAST_TYPES)
+            all_formats.update(cls.SPECIAL_TYPES)
 
-        # Add normalized versions of all type names
-        normalized_formats = {}
-        for type_name, format_info in all_formats.items():
-            normalized_name = cls.normalize_type_name(type_name)
-            normalized_formats[normalized_name] = format_info
+            # Add normalized versions of all type names
+            normalized_formats = {}
+            for type_name, format_info in all_formats.items():
+                normalized_name = cls.normalize_type_name(type_name)
+                normalized_formats[normalized_name] = format_info
 
-        all_formats.update(normalized_formats)
-        return all_formats
+            all_formats.update(normalized_formats)
+            cls._all_formats_cache = MappingProxyType(all_formats)
+        return cls._all_formats_cache
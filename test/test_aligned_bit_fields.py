@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CStructParser import CStructParser
+
+ALIGNED = '''
+typedef struct {
+    uint16_t lo : 8;
+    uint16_t hi : 8;
+    uint32_t word : 32;
+    uint8_t low_nibble : 4;
+    uint8_t high_nibble : 4;
+} Aligned;
+
+typedef struct {
+    uint8_t a : 5;
+    uint8_t b : 5;
+    uint8_t c : 3;
+} Overflowing;
+'''
+
+
+class TestAlignedBitFields(unittest.TestCase):
+    def test_sizes(self):
+        parser = CStructParser(ALIGNED)
+        self.assertEqual(parser.get_struct_size('Aligned'), 7)
+        # b does not fit next to a, c shares b's byte
+        self.assertEqual(parser.get_struct_size('Overflowing'), 2)
+        offsets = [field.bit_offset for field in parser.struct_fields['Overflowing'].values()]
+        self.assertEqual(offsets, [0, 0, 5])
+
+    def test_storage_unit_byte_order(self):
+        data = {'lo': 0x12, 'hi': 0x34, 'word': 0x01020304, 'low_nibble': 0xA, 'high_nibble': 0xB}
+        expected = {
+            'little': bytes([0x12, 0x34, 0x04, 0x03, 0x02, 0x01, 0xBA]),
+            'big': bytes([0x34, 0x12, 0x01, 0x02, 0x03, 0x04, 0xBA]),
+        }
+        for endian, packed in expected.items():
+            with self.subTest(endian=endian):
+                parser = CStructParser(ALIGNED, endian=endian)
+                self.assertEqual(parser.pack_data(data, 'Aligned'), packed)
+                self.assertEqual(parser.unpack_data(packed, 'Aligned'), data)
+
+    def test_full_width_fields(self):
+        parser = CStructParser(ALIGNED)
+        data = {'lo': 0xFF, 'hi': 0xFF, 'word': 2 ** 32 - 1, 'low_nibble': 0xF, 'high_nibble': 0xF}
+        packed = parser.pack_data(data, 'Aligned')
+        self.assertEqual(packed, b'\xff' * 7)
+        self.assertEqual(parser.unpack_data(packed, 'Aligned'), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
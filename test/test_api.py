@@ -0,0 +1,268 @@
+import array
+import marshal
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CStructParser import CStructParser
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HEADER_DIR = os.path.dirname(os.path.abspath(__file__))
+parser_module = sys.modules[CStructParser.__module__]
+
+RECORDS = '''
+typedef struct {
+    int16_t x;
+    float y[2];
+} Point;
+
+typedef struct {
+    Point origin;
+    Point path[3];
+    uint8_t id;
+} Shape;
+
+typedef struct {
+    uint32_t samples[40];
+    uint16_t short_samples[4];
+} Samples;
+
+typedef struct {
+    char a : 3;
+    char b : 5;
+    uint8_t c;
+} CharBits;
+'''
+
+
+def shape(seed: int) -> dict:
+    return {
+        'origin': {'x': seed, 'y': [seed + 0.5, seed + 1.5]},
+        'path': [{'x': -seed - i, 'y': [float(i), seed * 2.0]} for i in range(3)],
+        'id': seed,
+    }
+
+
+class TestPackInto(unittest.TestCase):
+    def setUp(self):
+        self.parser = CStructParser(RECORDS)
+
+    def test_offset_chaining(self):
+        size = self.parser.get_struct_size('Shape')
+        buffer = bytearray(3 + 2 * size)
+        offset = self.parser.pack_into(shape(1), 'Shape', buffer, 3)
+        self.assertEqual(offset, 3 + size)
+        offset = self.parser.pack_into(shape(2), 'Shape', memoryview(buffer), offset)
+        self.assertEqual(offset, 3 + 2 * size)
+        expected = bytes(3) + self.parser.pack_data(shape(1), 'Shape') + self.parser.pack_data(shape(2), 'Shape')
+        self.assertEqual(bytes(buffer), expected)
+
+    def test_bit_fields(self):
+        buffer = bytearray(4)
+        self.assertEqual(self.parser.pack_into({'a': 5, 'b': 31, 'c': 7}, 'CharBits', buffer, 2), 4)
+        self.assertEqual(buffer, bytearray([0, 0, 5 | 31 << 3, 7]))
+
+    def test_buffer_size_in_bytes(self):
+        buffer = bytearray(8)
+        self.assertEqual(self.parser.pack_into({'a': 5, 'b': 31, 'c': 7}, 'CharBits', memoryview(buffer).cast('I')), 2)
+        self.assertEqual(buffer[:2], bytearray([5 | 31 << 3, 7]))
+
+    def test_buffer_too_small(self):
+        size = self.parser.get_struct_size('Shape')
+        with self.assertRaises(ValueError):
+            self.parser.pack_into(shape(1), 'Shape', bytearray(size - 1))
+        with self.assertRaises(ValueError):
+            self.parser.pack_into(shape(1), 'Shape', bytearray(size), 1)
+        with self.assertRaises(ValueError):
+            self.parser.pack_into(shape(1), 'Shape', bytearray(size), -1)
+
+    def test_unknown_structure(self):
+        with self.assertRaises(ValueError):
+            self.parser.pack_into({}, 'Missing', bytearray(16))
+
+
+class TestRecordObjects(unittest.TestCase):
+    def test_as_object(self):
+        parser = CStructParser(RECORDS)
+        record = parser.unpack_data(parser.pack_data(shape(4), 'Shape'), 'Shape', as_object=True)
+        self.assertEqual(type(record).__name__, 'Shape')
+        self.assertEqual(record.id, 4)
+        self.assertEqual(record.origin.x, 4)
+        self.assertEqual(record.origin.y, [4.5, 5.5])
+        self.assertEqual([point.x for point in record.path], [-4, -5, -6])
+        self.assertEqual(type(record.path[0]).__name__, 'Point')
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(repr(record.origin), 'Point(x=4, y=[4.5, 5.5])')
+
+    def test_equality(self):
+        parser = CStructParser(RECORDS)
+        packed = parser.pack_data(shape(1), 'Shape')
+        self.assertEqual(parser.unpack_data(packed, 'Shape', as_object=True),
+                         parser.unpack_data(packed, 'Shape', as_object=True))
+        self.assertNotEqual(parser.unpack_data(packed, 'Shape', as_object=True),
+                            parser.unpack_data(parser.pack_data(shape(2), 'Shape'), 'Shape', as_object=True))
+
+
+class TestArrayBackend(unittest.TestCase):
+    data = {'samples': list(range(100, 140)), 'short_samples': [1, 2, 3, 65535]}
+
+    def test_array(self):
+        for endian in ('little', 'big'):
+            with self.subTest(endian=endian):
+                parser = CStructParser(RECORDS, endian=endian, array_backend='array')
+                result = parser.unpack_data(parser.pack_data(self.data, 'Samples'), 'Samples')
+                self.assertIsInstance(result['short_samples'], array.array)
+                self.assertEqual(result['short_samples'].itemsize, 2)
+                self.assertEqual(result['short_samples'].tolist(), self.data['short_samples'])
+                self.assertEqual(list(result['samples']), self.data['samples'])
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_numpy(self):
+        parser = CStructParser(RECORDS, array_backend='numpy')
+        packed = parser.pack_data(self.data, 'Samples')
+        result = parser.unpack_data(packed, 'Samples')
+        self.assertIsInstance(result['samples'], np.ndarray)
+        self.assertFalse(result['samples'].flags.writeable)
+        self.assertEqual(result['samples'].tolist(), self.data['samples'])
+        # ndarray input packs like a list
+        self.assertEqual(parser.pack_data(result, 'Samples'), packed)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_as_numpy_large_arrays_only(self):
+        parser = CStructParser(RECORDS)
+        result = parser.unpack_data(parser.pack_data(self.data, 'Samples'), 'Samples', as_numpy=True)
+        self.assertIsInstance(result['samples'], np.ndarray)
+        self.assertIsInstance(result['short_samples'], list)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            CStructParser(RECORDS, array_backend='tuple')
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestBulkDecoding(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(HEADER_DIR, 'test_bit_field.h')) as f:
+            self.parser = CStructParser(RECORDS + f.read())
+        self.records = [shape(i) for i in range(5)]
+        self.data = b''.join(self.parser.pack_data(record, 'Shape') for record in self.records)
+
+    def test_unpack_array(self):
+        records = self.parser.unpack_array(self.data, 'Shape')
+        self.assertEqual(records.shape, (5,))
+        self.assertEqual(records['origin']['x'].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(records['path']['y'][2].tolist(), [[0.0, 4.0], [1.0, 4.0], [2.0, 4.0]])
+        self.assertEqual(len(self.parser.unpack_array(self.data, 'Shape', count=2)), 2)
+
+    def test_unpack_array_bit_fields(self):
+        values = [{'flags': i, 'mode': i % 4, 'active': i % 2, 'reserved': 1000 * i, 'regular_field': i}
+                  for i in range(6)]
+        data = b''.join(self.parser.pack_data(value, 'BitFieldExample') for value in values)
+        records = self.parser.unpack_array(data, 'BitFieldExample')
+        self.assertEqual(records.dtype.names, ('flags', 'mode', 'active', 'reserved', 'regular_field'))
+        for name in records.dtype.names:
+            with self.subTest(field=name):
+                self.assertEqual(records[name].tolist(), [value[name] for value in values])
+
+    def test_unpack_array_char_bit_fields(self):
+        data = bytes([5 | 31 << 3, 7, 1, 2])
+        records = self.parser.unpack_array(data, 'CharBits')
+        self.assertEqual(records.tolist(), [(5, 31, 7), (1, 0, 2)])
+
+    def check_columns(self):
+        decode = self.parser.compile_unpacker('Shape')
+        columns = decode(self.data)
+        self.assertEqual(list(columns), ['origin', 'path', 'id'])
+        self.assertEqual(columns['id'].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(columns['origin']['x'].tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(columns['path']['x'].shape, (5, 3))
+        self.assertTrue(columns['path']['y'].flags.c_contiguous)
+        self.assertEqual(columns['path']['y'].tolist(),
+                         [[point['y'] for point in record['path']] for record in self.records])
+        self.assertEqual(decode(self.data, count=2)['id'].tolist(), [0, 1])
+
+    def test_compile_unpacker_numpy(self):
+        with mock.patch.object(parser_module, 'njit', None):
+            self.check_columns()
+
+    @unittest.skipIf(numba is None, "Numba is not installed")
+    def test_compile_unpacker_numba(self):
+        self.check_columns()
+
+    def test_compile_unpacker_keeps_its_backend(self):
+        with mock.patch.object(parser_module, 'njit', None):
+            decode = self.parser.compile_unpacker('Shape')
+        with mock.patch.object(parser_module, 'njit', mock.Mock()):
+            self.assertEqual(decode(self.data)['id'].tolist(), [0, 1, 2, 3, 4])
+
+    def test_compile_unpacker_rejects_bit_fields(self):
+        with self.assertRaises(ValueError):
+            self.parser.compile_unpacker('BitFieldExample')
+
+
+class TestHeaderCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.headers = os.path.join(self.directory, 'headers')
+        self.cache_dir = os.path.join(self.directory, 'cache')
+        os.mkdir(self.headers)
+        self.header = os.path.join(self.headers, 'cached.h')
+        with open(self.header, 'w') as f:
+            f.write('typedef struct { int a; } Cached;\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_unchanged_header_is_read_from_cache(self):
+        parser = CStructParser(self.headers, cache_dir=self.cache_dir)
+        self.assertEqual(list(parser.struct_fields['Cached']), ['a'])
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # Same size and modification time, so the cached scan is used
+        stat = os.stat(self.header)
+        with open(self.header, 'w') as f:
+            f.write('typedef struct { int b; } Cached;\n')
+        os.utime(self.header, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        parser = CStructParser(self.headers, cache_dir=self.cache_dir)
+        self.assertEqual(list(parser.struct_fields['Cached']), ['a'])
+
+    def test_changed_header_is_rescanned(self):
+        CStructParser(self.headers, cache_dir=self.cache_dir)
+        with open(self.header, 'w') as f:
+            f.write('typedef struct { int a; short b; } Cached;\n')
+        parser = CStructParser(self.headers, cache_dir=self.cache_dir)
+        self.assertEqual(list(parser.struct_fields['Cached']), ['a', 'b'])
+        self.assertEqual(parser.get_struct_size('Cached'), 6)
+
+    def test_corrupt_cache_is_rescanned(self):
+        CStructParser(self.headers, cache_dir=self.cache_dir)
+        cache_path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        for content in (b'\x00garbage', marshal.dumps({'Cached': []})):
+            with self.subTest(content=content):
+                with open(cache_path, 'wb') as f:
+                    f.write(content)
+                parser = CStructParser(self.headers, cache_dir=self.cache_dir)
+                self.assertEqual(list(parser.struct_fields['Cached']), ['a'])
+
+    def test_without_cache_dir(self):
+        parser = CStructParser(self.headers)
+        self.assertEqual(parser.get_struct_size('Cached'), 4)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
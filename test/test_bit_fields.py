@@ -0,0 +1,65 @@
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CStructParser import CStructParser
+
+HEADER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestBitFieldExample(unittest.TestCase):
+    data = {'flags': 5, 'mode': 2, 'active': 1, 'reserved': 123456, 'regular_field': 0xDEADBEEF}
+
+    def test_layout(self):
+        parser = CStructParser(HEADER_DIR)
+        self.assertEqual(parser.get_struct_size('BitFieldExample'), 8)
+        offsets = {name: field.bit_offset for name, field in parser.struct_fields['BitFieldExample'].items()}
+        self.assertEqual(offsets, {'flags': 0, 'mode': 3, 'active': 5, 'reserved': 6, 'regular_field': None})
+
+    def test_exact_bytes(self):
+        word = 5 | 2 << 3 | 1 << 5 | 123456 << 6
+        for endian, prefix in (('little', '<'), ('big', '>')):
+            with self.subTest(endian=endian):
+                parser = CStructParser(HEADER_DIR, endian=endian)
+                packed = parser.pack_data(self.data, 'BitFieldExample')
+                self.assertEqual(packed, struct.pack(prefix + 'iI', word, 0xDEADBEEF))
+                self.assertEqual(parser.unpack_data(packed, 'BitFieldExample'), self.data)
+
+    def test_values_are_masked(self):
+        parser = CStructParser(HEADER_DIR)
+        packed = parser.pack_data({'flags': 0xFF, 'mode': 0}, 'BitFieldExample')
+        self.assertEqual(parser.unpack_data(packed, 'BitFieldExample')['flags'], 7)
+        self.assertEqual(parser.unpack_data(packed, 'BitFieldExample')['mode'], 0)
+
+    def test_unpack_all_ones(self):
+        parser = CStructParser(HEADER_DIR)
+        self.assertEqual(parser.unpack_data(b'\xff' * 8, 'BitFieldExample'), {
+            'flags': 7, 'mode': 3, 'active': 1, 'reserved': 2 ** 26 - 1, 'regular_field': 2 ** 32 - 1,
+        })
+
+
+class TestBitFieldTypes(unittest.TestCase):
+    def test_char_bit_fields(self):
+        parser = CStructParser('typedef struct { char a:3; char b:5; uint8_t c; } CharBits;')
+        self.assertEqual(parser.get_struct_size('CharBits'), 2)
+        data = {'a': 5, 'b': 31, 'c': 7}
+        packed = parser.pack_data(data, 'CharBits')
+        self.assertEqual(packed, bytes([5 | 31 << 3, 7]))
+        self.assertEqual(parser.unpack_data(packed, 'CharBits'), data)
+
+    def test_floating_point_bit_fields_are_rejected(self):
+        for type_name in ('float', 'double'):
+            with self.subTest(type_name=type_name):
+                with self.assertRaises(ValueError):
+                    CStructParser(f'typedef struct {{ {type_name} a:3; }} FloatBits;')
+
+    def test_unknown_bit_field_type(self):
+        with self.assertRaises(ValueError):
+            CStructParser('typedef struct { Unknown a:3; } UnknownBits;')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import os
+import struct
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CStructParser import CStructParser
+
+HEADER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def sensor_data(seed: int) -> dict:
+    return {
+        'temperature': [seed + 0.5, seed + 1.25],
+        'humidity': [seed + i for i in range(8)],
+        'pressure': -1000 * seed,
+    }
+
+
+class TestSizes(unittest.TestCase):
+    def setUp(self):
+        self.parser = CStructParser(HEADER_DIR)
+
+    def test_struct_sizes(self):
+        expected = {
+            'SensorData': 28,
+            'Vector3D': 3,
+            'ObjectState': 18,
+            'DeviceData': 186,
+            'AllTypes': 64,
+            'MultiDimTest': 76,
+            'BitFieldExample': 8,
+        }
+        for name, size in expected.items():
+            with self.subTest(name=name):
+                self.assertEqual(self.parser.get_struct_size(name), size)
+
+    def test_long_is_four_bytes(self):
+        fields = self.parser.struct_fields['AllTypes']
+        self.assertEqual(fields['l'].size, 4)
+        self.assertEqual(fields['ul'].size, 4)
+
+    def test_multidimensional_arrays_are_flattened(self):
+        fields = self.parser.struct_fields['MultiDimTest']
+        self.assertEqual(fields['matrix'].array_size, 9)
+        self.assertEqual(fields['cube'].array_size, 8)
+        self.assertEqual(fields['image'].array_size, 8)
+
+    def test_unknown_structure(self):
+        with self.assertRaises(ValueError):
+            self.parser.get_struct_size('Missing')
+        with self.assertRaises(ValueError):
+            self.parser.unpack_data(b'', 'Missing')
+        with self.assertRaises(ValueError):
+            self.parser.pack_data({}, 'Missing')
+
+
+class TestParsing(unittest.TestCase):
+    def test_one_line_struct_body(self):
+        parser = CStructParser('typedef struct { int a; uint8_t b[2]; float c; } OneLine;')
+        self.assertEqual(list(parser.struct_fields['OneLine']), ['a', 'b', 'c'])
+        self.assertEqual(parser.get_struct_size('OneLine'), 10)
+
+    def test_comments_and_preprocessor_lines_are_skipped(self):
+        parser = CStructParser('''
+            #include <stdint.h>
+            #define COUNT 4
+            /* typedef struct { int hidden; } Hidden; */
+            typedef struct {
+                uint16_t a;  // trailing comment
+                /* block comment */ uint32_t b;
+            } Commented;
+        ''')
+        self.assertEqual(list(parser.struct_fields), ['Commented'])
+        self.assertEqual(list(parser.struct_fields['Commented']), ['a', 'b'])
+
+    def test_circular_dependency(self):
+        with self.assertRaises(RuntimeError):
+            CStructParser('typedef struct { B b; } A; typedef struct { A a; } B;')
+
+    def test_invalid_endian(self):
+        with self.assertRaises(ValueError):
+            CStructParser('typedef struct { int a; } A;', endian='middle')
+
+
+class TestRoundTrip(unittest.TestCase):
+    def test_device_data(self):
+        data = {
+            'name': [bytes([ord('a') + i]) for i in range(16)],
+            'timestamp': 0xDEADBEEF,
+            'readings': [sensor_data(i) for i in range(4)],
+            'movement': {
+                'position': {'x': 1, 'y': -2, 'z': 3},
+                'velocity': {'x': -4, 'y': 5, 'z': -6},
+                'rotation': [0.25, 0.5, 0.75],
+            },
+            'calibration_matrix': [float(i) for i in range(9)],
+        }
+        for endian in ('little', 'big'):
+            with self.subTest(endian=endian):
+                parser = CStructParser(HEADER_DIR, endian=endian)
+                packed = parser.pack_data(data, 'DeviceData')
+                self.assertEqual(len(packed), 186)
+                self.assertEqual(parser.unpack_data(packed, 'DeviceData'), data)
+
+    def test_all_types(self):
+        data = {
+            'c': b'x', 'uc': 255, 's': -32768, 'us': 65535, 'i': -2 ** 31, 'ui': 2 ** 32 - 1,
+            'l': -2 ** 31, 'ul': 2 ** 32 - 1, 'f': 1.5, 'd': -2.25,
+            'i8': -128, 'u8': 255, 'i16': -32768, 'u16': 65535, 'i32': -2 ** 31, 'u32': 2 ** 32 - 1,
+            'i64': -2 ** 63, 'u64': 2 ** 64 - 1,
+        }
+        for endian in ('little', 'big'):
+            with self.subTest(endian=endian):
+                parser = CStructParser(HEADER_DIR, endian=endian)
+                self.assertEqual(parser.unpack_data(parser.pack_data(data, 'AllTypes'), 'AllTypes'), data)
+
+    def test_multidim(self):
+        data = {
+            'matrix': [i / 4 for i in range(9)],
+            'cube': list(range(-4, 4)),
+            'image': list(range(8)),
+        }
+        parser = CStructParser(HEADER_DIR)
+        self.assertEqual(parser.unpack_data(parser.pack_data(data, 'MultiDimTest'), 'MultiDimTest'), data)
+
+
+class TestNestedPacking(unittest.TestCase):
+    data = {
+        'position': {'x': 1, 'y': 2, 'z': 3},
+        'velocity': {'x': -1, 'y': -2, 'z': -3},
+        'rotation': [0.5, 1.5, 2.5],
+    }
+
+    def test_exact_bytes(self):
+        for endian, prefix in (('little', '<'), ('big', '>')):
+            with self.subTest(endian=endian):
+                parser = CStructParser(HEADER_DIR, endian=endian)
+                expected = struct.pack(prefix + '3b3b3f', 1, 2, 3, -1, -2, -3, 0.5, 1.5, 2.5)
+                self.assertEqual(parser.pack_data(self.data, 'ObjectState'), expected)
+
+    def test_missing_values_pack_as_zero(self):
+        parser = CStructParser(HEADER_DIR)
+        self.assertEqual(parser.pack_data({}, 'ObjectState'), bytes(18))
+        packed = parser.pack_data({'position': {'y': 7}, 'rotation': [1.0]}, 'ObjectState')
+        self.assertEqual(parser.unpack_data(packed, 'ObjectState'), {
+            'position': {'x': 0, 'y': 7, 'z': 0},
+            'velocity': {'x': 0, 'y': 0, 'z': 0},
+            'rotation': [1.0, 0.0, 0.0],
+        })
+
+    def test_none_values_pack_as_zero(self):
+        parser = CStructParser('''
+            typedef struct {
+                int a;
+                float f[2];
+                uint8_t b : 3;
+                uint8_t c : 5;
+                char ch;
+            } WithNone;
+        ''')
+        packed = parser.pack_data({'a': None, 'f': [1.0], 'b': None, 'c': 3, 'ch': None}, 'WithNone')
+        self.assertEqual(parser.unpack_data(packed, 'WithNone'),
+                         {'a': 0, 'f': [1.0, 0.0], 'b': 0, 'c': 3, 'ch': b'\x00'})
+
+    def test_array_of_structures(self):
+        parser = CStructParser(HEADER_DIR)
+        readings = [sensor_data(i) for i in range(4)]
+        packed = parser.pack_data({'readings': readings}, 'DeviceData')
+        self.assertEqual(parser.unpack_data(packed, 'DeviceData')['readings'], readings)
+
+
+if __name__ == '__main__':
+    unittest.main()
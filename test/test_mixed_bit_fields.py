@@ -0,0 +1,99 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CStructParser import CStructParser
+
+MIXED = '''
+typedef struct {
+    uint8_t a : 3;
+    uint8_t b : 5;
+    uint16_t value;
+    uint32_t c : 12;
+    uint32_t d : 20;
+    int8_t tail;
+} Mixed;
+
+typedef struct {
+    Mixed items[2];
+    Mixed single;
+    uint16_t flags : 9;
+    uint16_t level : 7;
+} Outer;
+'''
+
+REPACKABLE = '''
+typedef struct {
+    unsigned int mode : 3;
+    unsigned int level : 5;
+    unsigned int flag : 2;
+} Flags;
+
+typedef struct {
+    uint8_t a : 7;
+    uint8_t b : 7;
+    uint8_t c : 7;
+} Bytes;
+
+typedef struct {
+    uint8_t a : 1;
+    uint16_t b : 16;
+} Wide;
+
+typedef struct {
+    uint64_t a : 40;
+    uint64_t b : 30;
+    int x;
+    uint32_t c : 1;
+    uint32_t d : 1;
+} Runs;
+'''
+
+
+def mixed(seed: int) -> dict:
+    return {'a': seed % 8, 'b': seed + 10, 'value': 1000 + seed, 'c': 4000 + seed,
+            'd': 1000000 + seed, 'tail': -seed}
+
+
+class TestMixedBitFields(unittest.TestCase):
+    def test_sizes(self):
+        parser = CStructParser(MIXED)
+        self.assertEqual(parser.get_struct_size('Mixed'), 8)
+        self.assertEqual(parser.get_struct_size('Outer'), 26)
+
+    def test_round_trip(self):
+        data = {'items': [mixed(1), mixed(2)], 'single': mixed(3), 'flags': 300, 'level': 100}
+        for endian in ('little', 'big'):
+            with self.subTest(endian=endian):
+                parser = CStructParser(MIXED, endian=endian)
+                packed = parser.pack_data(data, 'Outer')
+                self.assertEqual(len(packed), 26)
+                self.assertEqual(parser.unpack_data(packed, 'Outer'), data)
+
+
+class TestOptimizeBitfields(unittest.TestCase):
+    def test_sizes_never_grow(self):
+        plain = CStructParser(REPACKABLE)
+        packed = CStructParser(REPACKABLE, optimize_bitfields=True)
+        expected = {'Flags': (4, 2), 'Bytes': (3, 3), 'Wide': (3, 3), 'Runs': (24, 17)}
+        for name, sizes in expected.items():
+            with self.subTest(name=name):
+                self.assertEqual((plain.get_struct_size(name), packed.get_struct_size(name)), sizes)
+
+    def test_runs_that_do_not_shrink_keep_declared_types(self):
+        parser = CStructParser(REPACKABLE, optimize_bitfields=True)
+        types = [field.type_name for field in parser.struct_fields['Wide'].values()]
+        self.assertEqual(types, ['uint8_t', 'uint16_t'])
+
+    def test_round_trip(self):
+        data = {'a': 2 ** 40 - 1, 'b': 12345, 'x': -7, 'c': 1, 'd': 0}
+        for endian in ('little', 'big'):
+            with self.subTest(endian=endian):
+                parser = CStructParser(REPACKABLE, endian=endian, optimize_bitfields=True)
+                self.assertEqual(parser.unpack_data(parser.pack_data(data, 'Runs'), 'Runs'), data)
+
+
+if __name__ == '__main__':
+    unittest.main()